@@ -18,6 +18,7 @@ along with datamatrix.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 from datamatrix.py3compat import *
+import os
 from eyelinkparser._events import sample, fixation, saccade, blink
 from eyelinkparser._traceprocessor import defaulttraceprocessor
 from eyelinkparser._eyelinkparser import EyeLinkParser
@@ -25,6 +26,61 @@ from eyelinkparser._eyelinkparser import EyeLinkParser
 __version__ = '0.17.5'
 
 
-def parse(parser=EyeLinkParser, **kwdict):
+def parse(parser=EyeLinkParser, cache=False, **kwdict):
+    """Parses all data files in a folder and returns the result as a
+    DataMatrix. All keywords other than `parser` and `cache` are passed to the
+    parser; see `EyeLinkParser` for details.
 
+    Parameters
+    ----------
+    parser: type, optional
+        The parser class.
+    cache: bool, optional
+        Indicates whether the result should be cached on disk, in
+        `~/.cache/eyelinkparser`. The cache is identified by the contents and
+        names of the files in the data folder and by the keywords, so that
+        the data is parsed again when any of these change. The parser is only
+        identified by the name of its class, so after changing the code of a
+        custom parser, the cache should be cleared or not used. Keywords that
+        don't have a stable representation, such as a `lambda` passed as
+        `phasefilter`, disable the cache: the data is then parsed without
+        reading from or writing to the cache. This is recognized by the
+        default representation of Python objects (`<... at 0x...>`). The
+        cache is also not used when `output_dir` is specified.
+
+    Returns
+    -------
+    DataMatrix
+    """
+    if cache:
+        from eyelinkparser._cache import cached_parse
+        return cached_parse(parser, kwdict, __version__)
     return parser(**kwdict).dm
+
+
+def load_shards(output_dir):
+    """Reads back data that was parsed with the `output_dir` keyword, and
+    returns it as a single DataMatrix.
+
+    Parameters
+    ----------
+    output_dir: str
+        The folder to which the data was written.
+
+    Returns
+    -------
+    DataMatrix
+    """
+    from datamatrix import io, operations
+    from eyelinkparser._eyelinkparser import _stack, _SHARD_RE
+    # Other files in the folder are ignored. The shards are sorted by their
+    # index, which may have more digits than the padding for many files.
+    shards = []
+    for fname in os.listdir(output_dir):
+        m = _SHARD_RE.match(fname)
+        if m is not None:
+            shards.append((int(m.group(1)), fname))
+    dm = _stack([io.readpickle(os.path.join(output_dir, fname))
+                 for i, fname in sorted(shards)])
+    operations.auto_type(dm)
+    return dm
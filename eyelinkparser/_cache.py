@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of eyelinkparser.
+
+eyelinkparser is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+eyelinkparser is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with datamatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from datamatrix.py3compat import *
+import os
+import mmap
+import pickle
+import hashlib
+import logging
+
+
+def cache_folder():
+    """
+    desc:
+        Returns the folder in which parsed DataMatrix objects are cached.
+
+    returns:
+        type:   str
+    """
+    root = os.environ.get(u'XDG_CACHE_HOME',
+                          os.path.join(os.path.expanduser(u'~'), u'.cache'))
+    return os.path.join(root, u'eyelinkparser')
+
+
+def _file_digest(path):
+
+    sha = hashlib.sha256()
+    with open(path, u'rb') as fd:
+        # Empty files cannot be memory-mapped
+        if os.fstat(fd.fileno()).st_size:
+            with mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                sha.update(mm)
+    return sha.hexdigest()
+
+
+def cache_key(parser, kwdict, version):
+    """
+    desc:
+        Creates a key that identifies the result of parsing. The key is based
+        on the contents of the files in the data folder, rather than on their
+        modification times, so that files that are touched or copied without
+        being changed don't invalidate the cache. File names are also part of
+        the key, because they end up in the `path` column and determine the
+        order of the trials.
+
+    arguments:
+        parser:
+            desc:   The parser class.
+            type:   type
+        kwdict:
+            desc:   The keywords that are passed to the parser.
+            type:   dict
+        version:
+            desc:   The version of eyelinkparser.
+            type:   str
+
+    returns:
+        type:   str
+    """
+    folder = kwdict.get(u'folder', u'data')
+    sha = hashlib.sha256()
+    sha.update(safe_encode(u'{}\n{}.{}\n{!r}\n'.format(
+        version, parser.__module__, parser.__name__,
+        sorted(kwdict.items()))))
+    for fname in sorted(os.listdir(folder)):
+        path = os.path.join(folder, fname)
+        if not os.path.isfile(path):
+            continue
+        sha.update(safe_encode(u'{}\n{}\n'.format(path, _file_digest(path))))
+    return sha.hexdigest()
+
+
+def cached_parse(parser, kwdict, version):
+    """
+    desc:
+        Returns a cached DataMatrix if the data and the parser settings have
+        not changed since the last time that they were parsed, and otherwise
+        parses the data and caches the result. The parser class is identified
+        by its module and name, so changes to the code of a parser are not
+        noticed.
+    """
+    # Parsing to output_dir returns an empty DataMatrix and writes the actual
+    # data to disk. A cached result would skip writing the data.
+    if kwdict.get(u'output_dir') is not None:
+        logging.warning(u'not caching, because output_dir is specified')
+        return parser(**kwdict).dm
+    # Objects without a custom representation, such as functions, are
+    # represented by their memory address, which changes every session. The
+    # key would then never match again, so the result is not cached. This
+    # only recognizes the default representation of Python objects.
+    if u' at 0x' in repr(sorted(kwdict.items())):
+        logging.warning(u'not caching, because some keywords have no '
+                        u'stable representation')
+        return parser(**kwdict).dm
+    key = cache_key(parser, kwdict, version)
+    path = os.path.join(cache_folder(), key + u'.pkl')
+    if os.path.exists(path):
+        logging.info(u'loading cached data from {}'.format(path))
+        with open(path, u'rb') as fd:
+            return pickle.load(fd)
+    dm = parser(**kwdict).dm
+    os.makedirs(cache_folder(), exist_ok=True)
+    # Write to a temporary file first, so that an interrupted write doesn't
+    # leave a corrupt cache file behind
+    tmp_path = path + u'.tmp'
+    with open(tmp_path, u'wb') as fd:
+        pickle.dump(dm, fd, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    logging.info(u'cached data to {}'.format(path))
+    return dm
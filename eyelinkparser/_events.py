@@ -17,8 +17,10 @@ You should have received a copy of the GNU General Public License
 along with datamatrix.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+import math
 import warnings
 import numbers
+import itertools
 from datamatrix.py3compat import *
 import numpy as np
 try:
@@ -27,18 +29,27 @@ except ImportError:
     warnings.warn('Install fastnumbers for better performance')
     fastnumbers = None
 
+if fastnumbers is not None:
+    _isreal = fastnumbers.isreal
+else:
+    def _isreal(v):
+        return isinstance(v, (int, float)) and v > 0
+# fastnumbers >= 5 can convert a sequence directly into a numpy array
+_try_array = getattr(fastnumbers, 'try_array', None)
+
+# The possible lengths of split sample lines
+SAMPLE_LENGTHS = frozenset((5, 6, 8, 9))
+
 
 class Event(object):
 
-    def assert_numeric(self, l, indices):
+    __slots__ = ()
+
+    @staticmethod
+    def assert_numeric(l, indices):
 
-        if fastnumbers is not None:
-            for i in indices:
-                if not fastnumbers.isreal(l[i]):
-                    raise TypeError()
-            return
         for i in indices:
-            if not isinstance(l[i], (int, float)) or l[i] <= 0:
+            if not _isreal(l[i]):
                 raise TypeError()
 
 
@@ -49,7 +60,9 @@ class Blink(Event):
         Format:
         EBLINK R 5294685	5294774	90
     """
-    
+
+    __slots__ = ('st', 'et', 'duration')
+
     def __init__(self, l):
         self.assert_numeric(l, range(2, 5))
         self.st = l[2]
@@ -72,6 +85,8 @@ class Fixation(Event):
         TODO
     """
 
+    __slots__ = ('x', 'y', 'pupil_size', 'st', 'et', 'duration')
+
     def __init__(self, l):
         self.assert_numeric(l, range(2,8))
         self.x = l[5]
@@ -100,6 +115,8 @@ class Sample(Event):
         4333109	  981.4	  525.8	 1361.0	32768.0	...
     """
 
+    __slots__ = ('t', 'x', 'y', 'pupil_size')
+
     def __init__(self, l):
 
         self.assert_numeric(l, [0])
@@ -119,7 +136,7 @@ class Sample(Event):
             
     @staticmethod
     def match(l):
-        return len(l) in (5, 6, 8, 9) and not isinstance(l[0], basestring)
+        return len(l) in SAMPLE_LENGTHS and type(l[0]) is not str
 
 
 class Saccade(Event):
@@ -132,6 +149,8 @@ class Saccade(Event):
         TODO
     """
 
+    __slots__ = ('sx', 'sy', 'ex', 'ey', 'size', 'st', 'et', 'duration')
+
     def __init__(self, l):
 
         if len(l) == 11:
@@ -146,7 +165,7 @@ class Saccade(Event):
             self.sy = l[10]
             self.ex = l[11]
             self.ey = l[12]
-        self.size = np.sqrt((self.sx-self.ex)**2 + (self.sy-self.ey)**2)
+        self.size = math.hypot(self.sx - self.ex, self.sy - self.ey)
         self.st = l[2]
         self.et = l[3]
         self.duration = self.et - self.st
@@ -156,10 +175,75 @@ class Saccade(Event):
         return len(l) in (11, 15) and l[0] == 'ESACC'
 
 
-def event(l, cls):
+def _float_array(values):
+
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        pass
+    a = np.empty(len(values), dtype=np.float64)
+    for i, v in enumerate(values):
+        try:
+            a[i] = float(v)
+        except (TypeError, ValueError):
+            a[i] = np.nan
+    return a
+
+
+def parse_samples_block(lines, dtype=np.float64):
+    """
+    desc:
+        Converts a block of sample lines to arrays in a single vectorized
+        pass, rather than by creating a `Sample` object for each line. Missing
+        values ('.') become NaN, as does a pupil size of 0.
+
+    arguments:
+        lines:
+            desc:   A list of split lines for which `Sample.match()` is True,
+                    or lists of unconverted tokens of sample lines.
+            type:   list
+
+    keywords:
+        dtype:
+            desc:   The dtype of the gaze-position and pupil-size arrays. A
+                    float32 dtype halves their memory footprint, and is
+                    precise enough for these signals. Timestamps are always
+                    float64, because float32 cannot represent timestamps of
+                    long recordings exactly.
+            type:   dtype
+
+    returns:
+        desc:   A dict with 't', 'x', 'y', and 'pupil_size' keys, each of
+                which maps onto an array.
+        type:   dict
+    """
+    if _try_array is not None:
+        # Convert the entire block in a single call into an n x 4 array, of
+        # which the columns are then used as (strided) traces. The values can
+        # be numbers or strings that have not been converted yet. 'inf' and
+        # 'nan' become NaN, just like other strings.
+        a = _try_array(
+            list(itertools.chain.from_iterable([l[:4] for l in lines])),
+            dtype=np.float64, inf=np.nan, nan=np.nan, on_fail=np.nan,
+            on_type_error=np.nan)
+        t, x, y, pupil_size = a.reshape(-1, 4).T
+    else:
+        if lines:
+            columns = zip(*[l[:4] for l in lines])
+        else:
+            columns = [], [], [], []
+        t, x, y, pupil_size = (_float_array(c) for c in columns)
+    pupil_size[pupil_size == 0] = np.nan
+    return {
+        u't': t,
+        u'x': x.astype(dtype, copy=False),
+        u'y': y.astype(dtype, copy=False),
+        u'pupil_size': pupil_size.astype(dtype, copy=False)
+    }
+
+
+def create_event(l, cls):
 
-    if not cls.match(l):
-        return None
     try:
         return cls(l)
     except TypeError:
@@ -169,6 +253,13 @@ def event(l, cls):
             u'Unexpected exception during parsing of %s' % safe_decode(e))
 
 
+def event(l, cls):
+
+    if not cls.match(l):
+        return None
+    return create_event(l, cls)
+
+
 def sample(l):
     return event(l, Sample)
 def fixation(l):
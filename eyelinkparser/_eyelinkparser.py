@@ -22,22 +22,126 @@ import gc
 import math
 import sys
 import os
+import re
 import warnings
 import tempfile
 import subprocess
 import itertools
 import logging
+from io import TextIOWrapper
 try:
     import fastnumbers
 except ImportError:
     warnings.warn('Install fastnumbers for better performance')
     fastnumbers = None
+# fastnumbers >= 5 can convert an entire list of tokens in a single call
+if fastnumbers is not None and hasattr(fastnumbers, 'try_real'):
+    _try_real = fastnumbers.try_real
+    _INPUT = fastnumbers.INPUT
+else:
+    _try_real = None
 import numpy as np
-from datamatrix import DataMatrix, SeriesColumn, operations
-from eyelinkparser import sample, fixation, blink, defaulttraceprocessor
+from datamatrix import DataMatrix, SeriesColumn, operations, io
+from eyelinkparser import defaulttraceprocessor
+from eyelinkparser._events import Sample, Fixation, Blink, SAMPLE_LENGTHS, \
+    create_event, parse_samples_block, _try_array
 
 ANY_VALUE = int, float, basestring
 ANY_VALUES = list, int, float, basestring
+# The number of samples that are collected before they are converted to arrays
+SAMPLEBLOCK_SIZE = 4096
+# Used to convert tokens to numbers if fastnumbers is not available
+_INT_RE = re.compile(r'[-+]?\d+\Z')
+_FLOAT_RE = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?\Z')
+# The buffer size for reading .asc files, which are read front to back
+READ_BUFFER_SIZE = 1 << 20
+# The names of the files that are written to output_dir. The index prefix
+# keeps the shards in the order of the input files, and distinguishes files
+# with the same name from different archives.
+_SHARD_NAME = u'{:04d}-{}.pkl'
+_SHARD_RE = re.compile(r'(\d{4,})-.+\.pkl\Z')
+
+
+def _stack(dms):
+    """Stacks a list of DataMatrix objects into a single DataMatrix in one
+    operation, rather than merging them one at a time, which copies the
+    merged data again for every DataMatrix.
+    """
+    # Use the much faster stack() routine if it's available. Requires
+    # DataMatrix >= 1.0
+    if hasattr(operations, 'stack'):
+        return operations.stack(dms)
+    logging.warning('updating to DataMatrix >= 1.0 will be much faster')
+    dm = DataMatrix()
+    for _dm in dms:
+        dm <<= _dm
+    return dm
+
+
+class _ArchiveMember(TextIOWrapper):
+    """A text file that is read directly from a .tar.xz archive. The `path`
+    attribute indicates the archive and the name of the file in it.
+    """
+    path = None
+
+
+class _TraceBuffer(object):
+    """A float array that grows geometrically as values are appended to it.
+    This supports the parts of the `list` interface that are used for traces
+    and fixation lists, i.e. `append()`, `extend()`, `len()`, indexing, and
+    slicing, as well as conversion to a numpy array, so that values are stored
+    in typed memory rather than as separate Python objects.
+    """
+    __slots__ = ('_data', '_n')
+
+    def __init__(self, size=16, dtype=float):
+        self._data = np.empty(size, dtype=dtype)
+        self._n = 0
+
+    def append(self, value):
+
+        if self._n == len(self._data):
+            data = np.empty(2 * len(self._data), dtype=self._data.dtype)
+            data[:self._n] = self._data
+            self._data = data
+        self._data[self._n] = value
+        self._n += 1
+
+    def extend(self, values):
+
+        values = np.asarray(values, dtype=self._data.dtype).ravel()
+        n = self._n + len(values)
+        if n > len(self._data):
+            data = np.empty(max(n, 2 * len(self._data)),
+                            dtype=self._data.dtype)
+            data[:self._n] = self._data[:self._n]
+            self._data = data
+        self._data[self._n:n] = values
+        self._n = n
+
+    def __len__(self):
+
+        return self._n
+
+    def __getitem__(self, index):
+
+        return self._data[:self._n][index]
+
+    def __iter__(self):
+
+        return iter(self._data[:self._n])
+
+    def __array__(self, dtype=None, copy=None):
+
+        # Without a copy, the array is a view of the buffer, which is changed
+        # by later appends
+        a = self._data[:self._n]
+        if dtype is not None and np.dtype(dtype) != a.dtype:
+            if copy is False:
+                raise ValueError(
+                    u'cannot convert trace to %s without a copy' % dtype)
+            return a.astype(dtype)
+        return a.copy() if copy else a
 
 
 class EyeLinkParser(object):
@@ -86,9 +190,10 @@ class EyeLinkParser(object):
         started. This is mostly convenient for processing trials that consist
         of a single long epoch, or when no `start_phase` messages were written
         to the log file.
-    phasefilter: callable or None, optional
+    phasefilter: callable, list, tuple, set, or None, optional
         A function that receives a phase name as argument, and returns a bool
-        indicating whether that phase should be retained.
+        indicating whether that phase should be retained. Alternatively, a
+        collection of the names of the phases that should be retained.
     phasemap: dict, optional
         A dict in which keys are phase names that are renamed to the associated
         values. This is mostly useful to merge subsequent traces, in which
@@ -115,6 +220,19 @@ class EyeLinkParser(object):
         Indicates whether timestamp traces should be stored, which indicate the
         timestamps of the corresponding pupil and gaze-position traces. If
         enabled, timestamps are stored as `ptrace_[phase]` columns.
+    trace_dtype: dtype, optional
+        The dtype in which gaze-position and pupil-size samples are collected
+        while a phase is parsed. `np.float32` halves the memory that is needed
+        for long phases, at the cost of precision (about 7 significant
+        digits). Timestamps are always collected as `float64`. Traces are
+        stored as `float64` in the resulting `SeriesColumn`s regardless.
+    output_dir: str or None, optional
+        A folder to which the data of each file is written as a separate
+        DataMatrix pickle, or `None` to merge all data into a single
+        DataMatrix in memory. This keeps memory usage limited to one file at
+        a time, which is useful for large datasets. If specified, `dm` remains
+        empty, the paths of the written files are available as `shards`, and
+        the data can be read back with `eyelinkparser.load_shards()`.
     """
     def __init__(
         self,
@@ -131,7 +249,9 @@ class EyeLinkParser(object):
         asc_encoding=None,
         pupil_size=True,
         gaze_pos=True,
-        time_trace=True
+        time_trace=True,
+        trace_dtype=float,
+        output_dir=None
     ):
         self.dm = DataMatrix()
         if downsample is not None:
@@ -141,6 +261,9 @@ class EyeLinkParser(object):
             traceprocessor = defaulttraceprocessor(downsample=downsample)
         self._maxtracelen = maxtracelen
         self._traceprocessor = traceprocessor
+        # A collection of phase names is turned into a membership test
+        if isinstance(phasefilter, (list, tuple, set, frozenset)):
+            phasefilter = frozenset(phasefilter).__contains__
         self._phasefilter = phasefilter
         self._phasemap = phasemap
         self._edf2asc_binary = edf2asc_binary
@@ -150,37 +273,87 @@ class EyeLinkParser(object):
         self._pupil_size = pupil_size
         self._gaze_pos = gaze_pos
         self._time_trace = time_trace
+        self._trace_dtype = trace_dtype
+        self._output_dir = output_dir
+        self._stream_archives = not multiprocess
+        # Samples are collected and converted to arrays in blocks, rather than
+        # one by one. The traces are then only complete at the end of a
+        # phase. Therefore, this is skipped for subclasses that override
+        # parse_sample(), which then receives individual Sample objects, or
+        # any of the functions that may look at the traces during a phase.
+        self._batch_samples = all(
+            getattr(type(self), name) is getattr(EyeLinkParser, name)
+            for name in (u'parse_sample', u'parse_fixation', u'parse_blink',
+                         u'parse_line'))
+        # Inside trials, sample lines are not converted one by one, but their
+        # tokens are collected and converted per block. This is only done
+        # when none of the functions that see these lines are overridden.
+        self._raw_samples = _try_array is not None and self._batch_samples \
+            and all(
+                getattr(type(self), name) is getattr(EyeLinkParser, name)
+                for name in (u'split', u'convert_tokens', u'parse_error',
+                             u'is_message', u'parse_phase'))
+        # Inside trials, messages are recognized by the first token of the
+        # split line, rather than by checking the raw line again. This is
+        # skipped for subclasses that override is_message().
+        self._split_messages = \
+            type(self).is_message is EyeLinkParser.is_message
+        # Handlers for non-sample lines, keyed by the first token
+        self._event_handlers = {
+            u'EFIX': self._parse_fixation_line,
+            u'EBLINK': self._parse_blink_line
+        }
         # Get a list of input files. First, only files in the data folder that
         # match any of the extensions. Then, these files are passed to the
         # converter which may return multiple files, for example if they have
         # been compressed. The result is a list of iterators, which is chained
         # into a single iterator.
-        input_files = itertools.chain(*(
-            self.convert_file(os.path.join(folder, fname))
-            for fname in sorted(os.listdir(folder))
-            if (
-                fname.lower().endswith(ext.lower())
-                if isinstance(ext, basestring)
-                else any(fname.lower().endswith(e.lower()) for e in ext)
+        if isinstance(ext, basestring):
+            ext = ext,
+        ext = tuple(e.lower() for e in ext)
+        with os.scandir(folder) as entries:
+            paths = sorted(
+                (entry.name, entry.path) for entry in entries
+                if entry.name.lower().endswith(ext) and entry.is_file()
             )
+        input_files = itertools.chain(*(
+            self.convert_file(path) for fname, path in paths
         ))
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+            self.shards = self._write_shards(input_files, multiprocess)
+            return
         if multiprocess:
-            # Use the much faster stack_multiprocessing() routine if it's
-            # available. Requires DataMatrix >= 1.0
-            if hasattr(operations, 'stack_multiprocessing'):
-                self.dm = operations.stack_multiprocessing(
-                    self.parse_file, input_files, processes=multiprocess)
-            else:
-                import multiprocessing as mp
-                with mp.Pool(multiprocess) as p:
-                    filedms = p.map(self.parse_file, input_files)
-                while filedms:
-                    self.dm <<= filedms.pop()
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(multiprocess) as executor:
+                # Results are returned in the order of the files, so that the
+                # trials are in the same order as in the single-process case
+                self.dm = _stack(list(executor.map(self.parse_file,
+                                                   input_files)))
         else:
-            for fname in input_files:
-                self.dm <<= self.parse_file(fname)
+            self.dm = _stack([self.parse_file(fname) for fname in input_files])
         operations.auto_type(self.dm)
 
+    def _write_shards(self, input_files, multiprocess):
+
+        if not multiprocess:
+            return [self._write_shard(job) for job in enumerate(input_files)]
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(multiprocess) as executor:
+            return list(executor.map(self._write_shard,
+                                     list(enumerate(input_files))))
+
+    def _write_shard(self, job):
+
+        i, path = job
+        name = path if isinstance(path, basestring) else path.path
+        shard = os.path.join(
+            self._output_dir, _SHARD_NAME.format(i, os.path.basename(name)))
+        filedm = self.parse_file(path)
+        self.filedm = None
+        io.writepickle(filedm, shard)
+        return shard
+
     # Helper functions that can be overridden
 
     def on_start_file(self):
@@ -245,39 +418,54 @@ class EyeLinkParser(object):
 
     def parse_file(self, path):
 
-        logging.info(u'parsing {}'.format(path))
-        path = self.edf2asc(path)
+        if isinstance(path, basestring):
+            logging.info(u'parsing {}'.format(path))
+            path = self.edf2asc(path)
+            f = open(path, encoding=self._asc_encoding,
+                     buffering=READ_BUFFER_SIZE)
+        else:
+            # A file object, such as an .asc file in an archive
+            f = path
+            path = getattr(f, u'path', getattr(f, u'name', None))
+            logging.info(u'parsing {}'.format(path))
         self.trialid = None
         self.path = path
         self.on_start_file()
         ntrial = 0
         self._linestack = []
         trialdms = []
-        with open(path, encoding=self._asc_encoding) as f:
-            for line in self.stacked_file(f):
-                # Only messages can be start-trial messages, so performance we
-                # don't do anything with non-MSG lines.
-                if not self.is_message(line):
-                    continue
-                if self.is_start_trial(self.split(line)):
-                    ntrial += 1
-                    self.print_(u'.')
-                    trialdms.append(self.parse_trial(f))
-        # Use the much faster stack() routine if it's available. Requires
-        # DataMatrix >= 1.0
-        if hasattr(operations, 'stack'):
-            self.filedm = operations.stack(trialdms)
-        else:
-            logging.warning(
-                'updating to DataMatrix >= 1.0 will be much faster')
-            self.filedm = DataMatrix()
-            for trialdm in trialdms:
-                self.filedm <<= trialdm
-        self.on_end_file()
+        # Parsing allocates many short-lived containers, which would otherwise
+        # trigger many automatic garbage collections. These are disabled while
+        # the file is parsed, and the garbage is collected once afterwards.
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with f:
+                for line in self.stacked_file(f):
+                    # Only messages can be start-trial messages, so
+                    # performance we don't do anything with non-MSG lines.
+                    if not self.is_message(line):
+                        continue
+                    if self.is_start_trial(self.split(line)):
+                        ntrial += 1
+                        self.print_(u'.')
+                        trialdms.append(self.parse_trial(f))
+            self.filedm = _stack(trialdms)
+            self.on_end_file()
+        finally:
+            # The per-trial DataMatrix objects contain reference cycles, and
+            # are only freed by the garbage collector. Everything that was
+            # allocated during parsing is still in the youngest generation,
+            # so collecting only that generation frees them without walking
+            # the entire heap. This needs to happen before automatic
+            # collection is enabled again, because that would immediately
+            # move all of it to an older generation.
+            del trialdms
+            self._linestack = []
+            gc.collect(0)
+            if gc_enabled:
+                gc.enable()
         logging.info(u' ({} trials)\n'.format(ntrial))
-        # Force garbage collection. Without it, memory seems to fill
-        # up more quickly than necessary.
-        gc.collect()
         self._delete_temp_file(path)
         return self.filedm
     
@@ -300,18 +488,40 @@ class EyeLinkParser(object):
         if self._trialphase is not None:
             self.parse_phase(['MSG', 0, 'start_phase', self._trialphase])
         self.on_start_trial()
+        split_messages = self._split_messages
+        # The default parse_error() only recognizes lines with an 'ERROR'
+        # token, so other lines can be rejected on the raw line, which is
+        # cheaper than calling the method. Overridden versions are always
+        # called.
+        raw_error_check = type(self).parse_error is EyeLinkParser.parse_error
+        raw_samples = self._raw_samples
         for line in self.stacked_file(f):
-            l = self.split(line)
+            if raw_samples and line[:1].isdigit():
+                # Samples outside of phases are ignored anyway
+                if self.current_phase is None:
+                    continue
+                tokens = line.split()
+                if len(tokens) in SAMPLE_LENGTHS and tokens[0].isdigit():
+                    self._sampleblock.append(tokens)
+                    if len(self._sampleblock) >= SAMPLEBLOCK_SIZE:
+                        self.flush_samples()
+                    # Kept for end_phase() in case the trial ends on samples
+                    l = tokens
+                    continue
+                l = self.convert_tokens(tokens)
+            else:
+                l = self.split(line)
             if not l:
                 warnings.warn(u'Empty line')
                 continue
-            if self.parse_error(l):
+            if (u'ERROR' in line or not raw_error_check) \
+                    and self.parse_error(l):
                 self.trialdm.data_error = 1
                 warnings.warn('ending trial due to data error')
                 break
             # Only messages can be variables or end-trial messages, so to
             # improve performance don't even check.
-            if self.is_message(line):
+            if (l[0] == u'MSG' if split_messages else self.is_message(line)):
                 if self.is_end_trial(l):
                     break
                 if self.is_start_trial(l):
@@ -326,6 +536,10 @@ class EyeLinkParser(object):
             warnings.warn(
                 u'Trial ended while phase "%s" was still ongoing' \
                 % self.current_phase)
+            # The last line may be a sample that was batched as raw tokens,
+            # which are still strings here
+            if type(l[0]) is str and l[0].isdigit():
+                l = self.convert_tokens(l)
             self.end_phase(l)
         self.on_end_trial()
         return self.trialdm
@@ -333,7 +547,9 @@ class EyeLinkParser(object):
     def parse_variable(self, l):
 
         # MSG	6740629 var rt 805
-        if not self.match(l, u'MSG', int, u'var', basestring, ANY_VALUES):
+        if not (len(l) >= 5 and l[2] == u'var' and l[0] == u'MSG'
+                and isinstance(l[1], int) and isinstance(l[3], basestring)
+                and isinstance(l[4], ANY_VALUES)):
             return
         var = l[3]
         val = u' '.join([safe_decode(i) for i in l[4:]])
@@ -354,26 +570,34 @@ class EyeLinkParser(object):
                 u'Phase "%s" started while phase "%s" was still ongoing' \
                 % (phase, self.current_phase))
             self.end_phase(l)
-        self.current_phase = safe_decode(phase)
-        if u'ptrace_%s' % self.current_phase in self.trialdm:
+        # The phase name is interned, because it is used as a key and to
+        # build column names throughout the phase
+        self.current_phase = sys.intern(safe_decode(phase))
+        if u'ptrace_' + self.current_phase in self.trialdm:
             raise Exception('Phase {} occurs twice (timestamp:{})'.format(
                 self.current_phase, l[1]))
-        self.ptrace = []
-        self.xtrace = []
-        self.ytrace = []
-        self.ttrace = []
-        self.fixxlist = []
-        self.fixylist = []
-        self.fixstlist = []
-        self.fixetlist = []
-        self.blinkstlist = []
-        self.blinketlist = []
-        self._t_onset = self.trialdm['t_onset_%s' % self.current_phase] = l[1]
+        # Timestamps are always collected as float64, because float32 is not
+        # precise enough for them
+        self.ptrace = _TraceBuffer(dtype=self._trace_dtype)
+        self.xtrace = _TraceBuffer(dtype=self._trace_dtype)
+        self.ytrace = _TraceBuffer(dtype=self._trace_dtype)
+        self.ttrace = _TraceBuffer()
+        self.fixxlist = _TraceBuffer()
+        self.fixylist = _TraceBuffer()
+        self.fixstlist = _TraceBuffer()
+        self.fixetlist = _TraceBuffer()
+        self.blinkstlist = _TraceBuffer()
+        self.blinketlist = _TraceBuffer()
+        self._sampleblock = []
+        self._sampleblocks = []
+        self._t_onset = self.trialdm['t_onset_' + self.current_phase] = l[1]
 
     def end_phase(self, l):
 
-        self.trialdm['t_offset_%s' % self.current_phase] = l[1]
-        self.trialdm['trace_length_%s' % self.current_phase] = len(self.ptrace)
+        self._concatenate_sampleblocks()
+        phase = self.current_phase
+        self.trialdm['t_offset_' + phase] = l[1]
+        self.trialdm['trace_length_' + phase] = len(self.ptrace)
         for i, (tracelabel, prefix, trace) in enumerate([
             (u'pupil', u'ptrace_', self.ptrace),
             (u'xcoor', u'xtrace_', self.xtrace),
@@ -392,23 +616,24 @@ class EyeLinkParser(object):
                 continue
             if tracelabel == 'time' and not self._time_trace:
                 continue
-            trace = np.array(trace, dtype=float)
+            trace = np.asarray(trace, dtype=float)
             if tracelabel is not None and self._traceprocessor is not None:
                 trace = self._traceprocessor(tracelabel, trace)
             if self._maxtracelen is not None \
                 and len(trace) > self._maxtracelen:
                     warnings.warn(u'Trace %s is too long (%d samples)' \
-                        % (self.current_phase, len(trace)))
+                        % (phase, len(trace)))
                     trace = trace[:self._maxtracelen]
-            colname = prefix + self.current_phase
+            # Start the time trace at 0. This is done on the array, before it
+            # is written to the column, so that the column is written only
+            # once.
+            if prefix in ('ttrace_', 'fixstlist_', 'fixetlist_',
+                          'blinkstlist_', 'blinketlist_'):
+                trace = np.asarray(trace, dtype=float) - self._t_onset
+            colname = prefix + phase
             self.trialdm[colname] = SeriesColumn(
                 len(trace), defaultnan=True)
             self.trialdm[colname][0] = trace
-            # Start the time trace at 0
-            if len(trace) and prefix in ('ttrace_', 'fixstlist_',
-                                         'fixetlist_', 'blinkstlist',
-                                         'blinketlist'):
-                self.trialdm[colname][0] -= self._t_onset
         # DEBUG CODE
         # 	from matplotlib import pyplot as plt
         # 	plt.subplot(4,2,i+1)
@@ -419,6 +644,29 @@ class EyeLinkParser(object):
         # plt.show()
         self.current_phase = None
 
+    def flush_samples(self):
+
+        if self._sampleblock:
+            self._sampleblocks.append(parse_samples_block(
+                self._sampleblock, dtype=self._trace_dtype))
+            self._sampleblock = []
+
+    def _concatenate_sampleblocks(self):
+
+        self.flush_samples()
+        if not self._sampleblocks:
+            return
+        blocks = self._sampleblocks
+        self._sampleblocks = []
+        self.ttrace = np.concatenate(
+            [self.ttrace] + [block[u't'] for block in blocks])
+        self.ptrace = np.concatenate(
+            [self.ptrace] + [block[u'pupil_size'] for block in blocks])
+        self.xtrace = np.concatenate(
+            [self.xtrace] + [block[u'x'] for block in blocks])
+        self.ytrace = np.concatenate(
+            [self.ytrace] + [block[u'y'] for block in blocks])
+
     def parse_sample(self, s):
 
         self.ttrace.append(s.t)
@@ -441,12 +689,14 @@ class EyeLinkParser(object):
     def parse_phase(self, l):
 
         # For performance only check for start- and end-phase messages if there
-        # actually is a message
-        if l[0] == 'MSG':
-            if self.match(l, u'MSG', int, (u'start_phase', u'phase'), ANY_VALUE):
+        # actually is a message. The checks are written out, rather than done
+        # with match(), because this is called for every line.
+        if l[0] == 'MSG' and len(l) == 4 and isinstance(l[1], int) \
+                and isinstance(l[3], ANY_VALUE):
+            if l[2] in (u'start_phase', u'phase'):
                 self.start_phase(l)
                 return
-            if self.match(l, u'MSG', int, (u'end_phase', u'stop_phase'), ANY_VALUE):
+            if l[2] in (u'end_phase', u'stop_phase'):
                 # Phases are not ended if they are in the phasemap, because
                 # they should be merged with a subsequent phase.
                 if l[3] in self._phasemap:
@@ -459,38 +709,65 @@ class EyeLinkParser(object):
                 return
         if self.current_phase is None:
             return
-        s = sample(l)
-        if s is not None:
-            self.parse_sample(s)
+        tag = l[0]
+        # Samples start with a timestamp, all other lines with a string
+        if type(tag) is not str:
+            if len(l) not in SAMPLE_LENGTHS:
+                return
+            if self._batch_samples:
+                self._sampleblock.append(l)
+                if len(self._sampleblock) >= SAMPLEBLOCK_SIZE:
+                    self.flush_samples()
+                return
+            s = create_event(l, Sample)
+            if s is not None:
+                self.parse_sample(s)
             return
-        f = fixation(l)
-        if f is not None:
-            self.parse_fixation(f)
-        b = blink(l)
-        if b is not None:
-            self.parse_blink(b)
+        handler = self._event_handlers.get(tag)
+        if handler is not None:
+            handler(l)
+
+    def _parse_fixation_line(self, l):
+
+        if Fixation.match(l):
+            f = create_event(l, Fixation)
+            if f is not None:
+                self.parse_fixation(f)
+
+    def _parse_blink_line(self, l):
+
+        if Blink.match(l):
+            b = create_event(l, Blink)
+            if b is not None:
+                self.parse_blink(b)
 
     def is_start_trial(self, l):
 
+        # The checks are written out, rather than done with match(), because
+        # this is called for every message.
+        if len(l) not in (3, 4) or l[2] != u'start_trial' \
+                or l[0] != u'MSG' or not isinstance(l[1], int):
+            return False
         # MSG	6735155 start_trial 1
-        if self.match(l, u'MSG', int, u'start_trial', ANY_VALUE):
+        if len(l) == 4:
+            if not isinstance(l[3], ANY_VALUE):
+                return False
             self.trialid = l[3]
             self.current_phase = None
             return True
         # MSG	6735155 start_trial
-        if self.match(l, u'MSG', int, u'start_trial'):
-            if self.trialid is None:
-                self.trialid = 0
-            else:
-                self.trialid += 1
-            self.current_phase = None
-            return True
-        return False
+        if self.trialid is None:
+            self.trialid = 0
+        else:
+            self.trialid += 1
+        self.current_phase = None
+        return True
 
     def is_end_trial(self, l):
 
         # MSG	6740629 end_trial
-        if self.match(l, u'MSG', int, (u'end_trial', u'stop_trial')):
+        if len(l) == 3 and l[2] in (u'end_trial', u'stop_trial') \
+                and l[0] == u'MSG' and isinstance(l[1], int):
             self.trialid = None
             return True
         return False
@@ -501,22 +778,33 @@ class EyeLinkParser(object):
 
     def split(self, line):
 
+        return self.convert_tokens(line.split())
+
+    def convert_tokens(self, tokens):
+
+        if _try_real is not None:
+            # Convert the entire line in a single call, rather than calling
+            # into fastnumbers once for every token. 'nan' and 'inf' are kept
+            # as strings.
+            return _try_real(tokens, inf=_INPUT, nan=_INPUT, map=list)
         if fastnumbers is not None:
-            return [fastnumbers.fast_real(s, nan=u'nan', inf=u'inf') \
-                for s in line.split()]
+            # Bind fast_real locally, because this is called for every token
+            fast_real = fastnumbers.fast_real
+            return [fast_real(s, nan=u'nan', inf=u'inf') for s in tokens]
+        # Without fastnumbers, tokens are classified with regular expressions
+        # rather than by trying (and mostly failing) to convert them, because
+        # raising and catching exceptions is slow. The expressions don't match
+        # 'inf' and 'nan', which are therefore kept as strings.
         l = []
-        for s in line.split():
-            try:
+        for s in tokens:
+            if _INT_RE.match(s):
                 l.append(int(s))
-            except:
-                try:
-                    # Make sure we don't convert 'inf' and 'nan' strings to
-                    # float
-                    assert(not math.isinf(float(s)))
-                    assert(not math.isnan(float(s)))
-                    l.append(float(s))
-                except:
-                    l.append(s)
+            elif _FLOAT_RE.match(s):
+                f = float(s)
+                # Values that are too large to represent, such as 1e999
+                l.append(s if math.isinf(f) else f)
+            else:
+                l.append(s)
         return l
 
     def _temp_path(self, path):
@@ -533,10 +821,21 @@ class EyeLinkParser(object):
             yield path
         else:
             # Compressed files are extracted and the contents are then converted
-            # again
+            # again. .asc files are read directly from the archive, without
+            # first writing them to disk. This is not possible when files are
+            # parsed in separate processes, because file objects cannot be
+            # passed to other processes.
             from tarfile import TarFile
             tf = TarFile.open(path)
             for ti in tf:
+                if self._stream_archives and ti.isfile() \
+                        and ti.name.lower().endswith(u'.asc'):
+                    logging.info('Reading {} ...'.format(ti.name))
+                    f = _ArchiveMember(tf.extractfile(ti),
+                                       encoding=self._asc_encoding)
+                    f.path = os.path.join(path, ti.name)
+                    yield f
+                    continue
                 tmp_folder = self._temp_path(ti.name)
                 new_path = os.path.join(tmp_folder, ti.name)
                 self._register_temp_file(new_path)
@@ -18,25 +18,117 @@ along with datamatrix.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 from datamatrix.py3compat import *
-import functools
+import inspect
+import numpy as np
 from datamatrix import series as srs
 
+# Older versions of datamatrix don't support the mode keyword. Check this once,
+# rather than trying (and failing) for each trace.
+_BLINKRECONSTRUCT_MODE = \
+    u'mode' in inspect.signature(srs._blinkreconstruct).parameters
 
-def _fnc(label, trace, blinkreconstruct, downsample, mode):
 
-    if label == 'pupil' and blinkreconstruct:
-        try:
-            trace = srs._blinkreconstruct(trace, mode=mode)
-        except TypeError:
-            warn('blinkreconstruct does not support mode keyword. '
-                 'Please update datamatrix.')
-    if downsample is not None:
-        trace = srs._downsample(trace, downsample)
-    return trace
+def _downsample(trace, by):
+    """
+    desc:
+        Downsamples a single array by averaging consecutive blocks of `by`
+        samples. Remaining samples that don't fill a complete block are
+        discarded. This gives the same result as `srs._downsample()`, but
+        NaN-aware averaging is only applied to the blocks that contain NaN
+        values, which are usually few.
+    """
+    trace = np.asarray(trace, dtype=np.float64)
+    blocks = trace[:by * (trace.shape[0] // by)].reshape(-1, by)
+    result = blocks.mean(axis=1)
+    nan_blocks = np.isnan(result)
+    if nan_blocks.any():
+        result[nan_blocks] = np.nanmean(blocks[nan_blocks], axis=1)
+    return result
+
+
+def _decimate(trace, by):
+    """
+    desc:
+        Downsamples a single array with an anti-aliasing filter. The signal is
+        filtered with the zero-phase FIR filter of `scipy.signal.decimate()`,
+        but padded with its edge values rather than with zeros, which would
+        otherwise distort the start and end of the trace (i.e. the baseline
+        period). The filtered signal is then sampled at the centres of the
+        blocks that _downsample() averages, and truncated to the same length,
+        so that decimated traces line up with the other traces. A NaN value
+        would spread over the full length of the filter, so traces with NaN
+        values are downsampled with _downsample() instead.
+    """
+    from scipy.signal import firwin, fftconvolve
+    trace = np.asarray(trace, dtype=np.float64)
+    n = trace.shape[0] // by
+    if not n:
+        return trace[:0]
+    # Without downsampling there is nothing to filter out, and NaN values
+    # would spread over the full length of the filter
+    if by == 1 or np.isnan(trace).any():
+        return _downsample(trace, by)
+    fir = firwin(20 * by + 1, 1. / by, window='hamming')
+    padded = np.pad(trace, 10 * by, mode='edge')
+    filtered = fftconvolve(padded, fir, mode='valid')
+    # For even block sizes, the centre falls between two samples
+    centre = (by - 1) // 2
+    result = filtered[centre::by][:n]
+    if not by % 2:
+        result = (result + filtered[centre + 1::by][:n]) / 2
+    return result
+
+
+class _TraceProcessor(object):
+
+    """
+    desc:
+        The function returned by defaulttraceprocessor(). The settings are
+        stored as attributes, so that calling it doesn't require keywords to
+        be unpacked for every trace, as a functools.partial() would. Unlike a
+        closure, this can be pickled, which is required for multiprocessing.
+    """
+
+    __slots__ = ('blinkreconstruct', 'downsample', 'mode', 'decimate')
+
+    def __init__(self, blinkreconstruct, downsample, mode, decimate=False):
+
+        self.blinkreconstruct = blinkreconstruct
+        self.downsample = downsample
+        self.mode = mode
+        self.decimate = decimate
+
+    def __repr__(self):
+
+        # The representation is part of the key for parse(cache=True)
+        return (u'defaulttraceprocessor(blinkreconstruct={!r}, '
+                u'downsample={!r}, mode={!r}, decimate={!r})').format(
+                    self.blinkreconstruct, self.downsample, self.mode,
+                    self.decimate)
+
+    def __call__(self, label, trace):
+
+        if label == 'pupil' and self.blinkreconstruct:
+            if _BLINKRECONSTRUCT_MODE:
+                # The reconstruction works on plain float64 arrays, so make
+                # sure that the trace doesn't need to be converted along the
+                # way
+                trace = srs._blinkreconstruct(
+                    np.ascontiguousarray(trace, dtype=np.float64),
+                    mode=self.mode)
+            else:
+                warn('blinkreconstruct does not support mode keyword. '
+                     'Please update datamatrix.')
+        if self.downsample is not None:
+            if self.decimate and label == 'pupil':
+                trace = _decimate(trace, self.downsample)
+            else:
+                trace = _downsample(trace, self.downsample)
+        return trace
 
 
 def defaulttraceprocessor(blinkreconstruct=False,
-                          downsample=None, mode='original'):
+                          downsample=None, mode='original', decimate=False):
     """
     desc:
         Creates a function that is suitable as traceprocessor argument for
@@ -57,15 +149,20 @@ def defaulttraceprocessor(blinkreconstruct=False,
                     but original mode is the default for purposes of backwards
                     compatibility.
             type:   [str]
+        decimate:
+            desc:   Indicates whether pupil-size traces should be downsampled
+                    with an anti-aliasing filter (as `scipy.signal.decimate()`
+                    does) rather than by averaging blocks of samples. This
+                    avoids aliasing for large downsampling factors. Because
+                    the filter would spread NaN values, traces that contain
+                    NaN values are downsampled by averaging. Therefore, this
+                    is best combined with blink reconstruction. Requires
+                    `scipy`.
+            type:   bool
 
     returns:
         desc:   A function suitable as traceprocessor argument.
         type:   callable
     """
 
-    return functools.partial(
-        _fnc,
-        blinkreconstruct=blinkreconstruct,
-        downsample=downsample,
-        mode=mode
-    )
+    return _TraceProcessor(blinkreconstruct, downsample, mode, decimate)
@@ -18,9 +18,9 @@ along with datamatrix.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 
+import numpy as np
 from datamatrix import operations as ops
 from matplotlib import pyplot as plt
-import seaborn as sns
 
 
 def data_quality (data, signal, baseline, group, 
@@ -78,30 +78,66 @@ def data_quality (data, signal, baseline, group,
             Default is ±1.5 from cut-off z-value (calculated based on determined     z-threshold).
             type: float/tuple
     """
+    # All statistics are computed before any plotting starts. The plotting
+    # itself must happen sequentially on the main thread anyway.
     if group is None:
-        _data_quality_group_plot(signal,baseline,z_threshold,
-                                 downsample, xlabel_trace, ylabel_trace,
-                                 ylim_trace, xlabel_hist, 
-                                 ylabel_hist, xlim_hist)
+        groups = [(None, signal, baseline)]
     else:
-        for group, sdata in ops.split(group):
-            print('Subject {}'.format(group))
-            _data_quality_group_plot(signal[sdata], 
-                                     baseline[sdata], z_threshold,
-                                     downsample, xlabel_trace, ylabel_trace, 
-                                     ylim_trace, xlabel_hist, ylabel_hist, xlim_hist)
+        # Find the rows of all groups at once, rather than selecting the rows
+        # of each group with a separate pass through the data
+        values, inverse = np.unique(np.asarray(group), return_inverse=True)
+        order = np.argsort(inverse, kind='stable')
+        bounds = np.cumsum(np.bincount(inverse))[:-1]
+        groups = []
+        for value, rows in zip(values, np.split(order, bounds)):
+            rows = rows.tolist()
+            groups.append((value, signal[rows, :], baseline[rows]))
+    stats = [_compute_group_stats(gbaseline, z_threshold)
+             for _, _, gbaseline in groups]
+    for (value, gsignal, _), gstats in zip(groups, stats):
+        if value is not None:
+            print('Subject {}'.format(value))
+        _data_quality_group_plot(gsignal, gstats, downsample, xlabel_trace,
+                                 ylabel_trace, ylim_trace, xlabel_hist,
+                                 ylabel_hist, xlim_hist)
     data.z_baseline = ops.z(baseline)
     print('Number of trials before removing outliers: N(trial) = {}'.format(len(data)))
-    data = data.z_baseline >= -z_threshold 
-    data = data.z_baseline <= z_threshold 
+    # Select both tails in a single pass, rather than in two successive
+    # selections that each create a new DataMatrix
+    keep = np.abs(np.asarray(data.z_baseline, dtype=float)) <= z_threshold
+    # An empty list of rows selects all rows, so the case in which no trial
+    # is kept is handled separately
+    data = data[np.flatnonzero(keep).tolist()] if keep.any() else data[0:0]
     print('Number of trials after removing outliers: N(trial) = {}'.format(len(data)))
 
 
-def _data_quality_group_plot(signal, baseline, 
-                             z_threshold,downsample,
+def _compute_group_stats(baseline, z_threshold):
+    """
+    desc:
+        Computes everything that is needed for the baseline panel of one
+        group: the outlier cut-offs and a density histogram.
+
+    returns:
+        desc:   A (cutoff1, cutoff2, counts, edges) tuple.
+        type:   tuple
+    """
+    baseline_mean = baseline.mean
+    baseline_std = baseline.std
+    cutoff1 = baseline_mean -z_threshold*baseline_std
+    cutoff2 = baseline_mean +z_threshold*baseline_std
+    # A plain density histogram. This is much cheaper than seaborn's
+    # (deprecated) distplot(), which also estimates a KDE.
+    values = np.asarray(baseline, dtype=float)
+    counts, edges = np.histogram(values[np.isfinite(values)], bins='auto',
+                                 density=True)
+    return cutoff1, cutoff2, counts, edges
+
+
+def _data_quality_group_plot(signal, stats, downsample,
                              xlabel_trace, ylabel_trace, 
                              ylim_trace, xlabel_hist, 
                              ylabel_hist, xlim_hist):
+    cutoff1, cutoff2, counts, edges = stats
     plt.figure(figsize=(12, 6))
     plt.subplot(121)
     plt.title(r"$\bf{" + 'a) ' + "}$" + ' Pupil traces', fontsize=14, loc='left')
@@ -113,14 +149,10 @@ def _data_quality_group_plot(signal, baseline,
     plt.ylim(ylim_trace)
     plt.subplot(122)
     plt.title(r"$\bf{" + 'b) ' + "}$" + ' Baseline pupil sizes', fontsize=14, loc='left')
-    baseline_mean = baseline.mean
-    baseline_std = baseline.std
-    cutoff1 = baseline_mean -z_threshold*baseline_std
-    cutoff2 = baseline_mean +z_threshold*baseline_std
     plt.axvline(cutoff1,color='black',linestyle=':')
     plt.axvline(cutoff2,color='black',linestyle=':')
     plt.xlabel(xlabel_hist) 
     plt.ylabel(ylabel_hist)
-    sns.distplot(baseline)
+    plt.stairs(counts, edges, fill=True, alpha=.4)
     plt.xlim(cutoff1+xlim_hist[0], cutoff2+xlim_hist[1])
     plt.show()
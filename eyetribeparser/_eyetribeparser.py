@@ -19,6 +19,14 @@ along with datamatrix.  If not, see <http://www.gnu.org/licenses/>.
 
 import numpy as np
 from eyelinkparser import EyeLinkParser
+try:
+    from fastnumbers import fast_float
+except ImportError:
+    def fast_float(x, default=None):
+        try:
+            return float(x)
+        except (TypeError, ValueError):
+            return default
 
 
 def chain(*functions):
@@ -38,40 +46,59 @@ class EyeTribeParser(EyeLinkParser):
     def init_infix(self):
 
         self.infix = False
+        self._reset_fixation()
+
+    def _reset_fixation(self):
+
+        # Running sums and counts of the valid (non-NaN) samples in the
+        # current fixation, so that the fixation means are available as soon
+        # as the fixation ends, without another pass over the samples
+        self._sx = self._sy = self._sps = 0.
+        self._nx = self._ny = self._nps = 0
+        self._t_first = self._t_last = None
 
     def split(self, line):
 
-        l = EyeLinkParser.split(self, line)
-        if not l:
-            return l
+        tokens = line.split()
+        if not tokens:
+            return tokens
         # Convert messages to EyeLink format
-        if l[0] == u'MSG':
-            l = l[3:]
+        if tokens[0] == u'MSG':
+            l = self.convert_tokens(tokens[3:])
             l.insert(0, u'MSG')
             return l
-        # Convert samples to EyeLink format:
-        if len(l) == 24:
-            x, y, ps = l[7:10]
-            t = l[2]
-            fix = l[3] == 'True'
+        # Convert samples to EyeLink format. The layout of sample lines is
+        # fixed, so only the four fields that are actually used are converted
+        # to numbers.
+        if len(tokens) == 24:
+            t, x, y, ps = self.convert_tokens(
+                [tokens[2], tokens[7], tokens[8], tokens[9]])
+            fix = tokens[3] == 'True'
             if fix:
                 if not self.infix:
-                    self.xlist = []
-                    self.ylist = []
-                    self.tlist = []
-                    self.pslist = []
-                self.xlist.append(x)
-                self.ylist.append(y)
-                self.tlist.append(t)
-                self.pslist.append(ps)
+                    self._reset_fixation()
+                v = fast_float(x, default=np.nan)
+                if v == v:
+                    self._sx += v
+                    self._nx += 1
+                v = fast_float(y, default=np.nan)
+                if v == v:
+                    self._sy += v
+                    self._ny += 1
+                v = fast_float(ps, default=np.nan)
+                if v == v:
+                    self._sps += v
+                    self._nps += 1
+                if self._t_first is None:
+                    self._t_first = t
+                self._t_last = t
             elif self.infix:
-                mx = np.nanmean(self.xlist)
-                my = np.nanmean(self.ylist)
-                mps = np.nanmean(self.pslist)
-                st = self.tlist[0]
-                et = self.tlist[-1]
+                mx = self._sx / self._nx if self._nx else np.nan
+                my = self._sy / self._ny if self._ny else np.nan
+                mps = self._sps / self._nps if self._nps else np.nan
+                st = self._t_first
+                et = self._t_last
                 self.parse_phase(['EFIX', 'R', st, et, et-st, mx, my, mps])
             self.infix = fix
-            l = [l[2], x, y, ps, u'...']
-            return l
-        return l
+            return [t, x, y, ps, u'...']
+        return self.convert_tokens(tokens)
@@ -49,7 +49,9 @@ class GazePointParser(EyeLinkParser):
         
     def is_message(self, line):
 
-        return len(super().split(line)) >= 42
+        # Only the number of fields matters here, so there's no need to
+        # convert them to numbers as split() does
+        return len(line.split()) >= 42
     
     def on_end_file(self):
         
@@ -24,6 +24,10 @@ from eyelinkparser._eyelinkparser import ANY_VALUE, ANY_VALUES
 
 class SMIParser(EyeLinkParser):
 
+    # The tokens of a line that was pushed back by is_end_trial(), so that it
+    # doesn't need to be split again
+    _pending_line = None
+
     def __init__(self, **kwargs):
 
         if u'ext' not in kwargs:
@@ -34,7 +38,9 @@ class SMIParser(EyeLinkParser):
 
         # 12529411046	MSG	1	# Message: 066_baseline.jpg
         if self.match(l, int, u'MSG', int, ANY_VALUES):
-            self.redo_line(u' '.join([str(e) for e in l]))
+            line = u' '.join([str(e) for e in l])
+            self._pending_line = line, l
+            self.redo_line(line)
             return True
         return False
 
@@ -71,6 +77,10 @@ class SMIParser(EyeLinkParser):
 
     def split(self, line):
 
+        if self._pending_line is not None and line is self._pending_line[0]:
+            l = self._pending_line[1]
+            self._pending_line = None
+            return l
         l = EyeLinkParser.split(self, line)
         # Convert samples to EyeLink format. The IDF encodes like this:
         # 00 Time
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+"""
+This file is part of eyelinkparser.
+
+eyelinkparser is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+eyelinkparser is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with datamatrix.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+from eyelinkparser._traceprocessor import _decimate, _downsample
+
+
+def test_decimate_alignment():
+
+    # A ramp passes the anti-aliasing filter unchanged, so away from the edges
+    # the decimated trace should equal the block means, which are also what
+    # the time trace is downsampled to
+    trace = np.arange(5003, dtype=float)
+    for by in (2, 3, 10, 100):
+        decimated = _decimate(trace, by)
+        downsampled = _downsample(trace, by)
+        assert decimated.shape == downsampled.shape
+        assert np.allclose(decimated[11:-11], downsampled[11:-11])
+
+
+def test_decimate_nan():
+
+    trace = np.random.random(1000)
+    trace[500] = np.nan
+    decimated = _decimate(trace, 10)
+    assert np.isnan(decimated).sum() == 0
+    assert np.allclose(decimated, _downsample(trace, 10))